@@ -14,21 +14,28 @@ In production, you would integrate with:
 This function is called by Step Functions after order validation.
 """
 
-import json
+import logging
 import os
+import random
 import time
-import hashlib
+import secrets
 from datetime import datetime
 from decimal import Decimal
 from typing import Dict, Any
-import random
 
-# Custom JSON encoder to handle Decimal types
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
+# Simulated gateway latency for the mock (0 = no delay). A real integration
+# should call the provider through a pooled HTTP client rather than sleeping.
+PAYMENT_MOCK_DELAY_MS = int(os.environ.get('PAYMENT_MOCK_DELAY_MS', '0'))
+
+# Event payloads are only dumped at DEBUG; set LOG_LEVEL=DEBUG to see them
+logger = logging.getLogger()
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+
+# orjson fallback to handle Decimal types
+def decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 
 def lambda_handler(event, context):
@@ -61,7 +68,10 @@ def lambda_handler(event, context):
     }
     """
     
-    print(f"Processing payment for order: {json.dumps(event, cls=DecimalEncoder)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        import orjson  # only needed for debug dumps; kept off the cold-start path
+        logger.debug("Processing payment for order: %s", orjson.dumps(event, default=decimal_default).decode())
+    logger.info("Processing payment order_id=%s amount=%s", event.get('orderId'), event.get('totalAmount'))
     
     try:
         order_id = event.get('orderId')
@@ -75,24 +85,22 @@ def lambda_handler(event, context):
             amount=total_amount
         )
         
-        # Build response with payment result
-        response = {
-            **event,  # Include all original fields
-            'paymentResult': payment_result
-        }
+        # Attach payment result to the input (Lambda discards the event after
+        # returning, so extending it in place avoids copying the payload)
+        event['paymentResult'] = payment_result
         
         # Log result
         if payment_result['status'] == 'success':
-            print(f"✅ Payment successful for order {order_id}: {payment_result['transactionId']}")
+            logger.info("✅ Payment successful for order %s: %s", order_id, payment_result['transactionId'])
         else:
-            print(f"❌ Payment failed for order {order_id}: {payment_result['message']}")
+            logger.warning("❌ Payment failed for order %s: %s", order_id, payment_result['message'])
             # Raise exception so Step Functions can catch it
             raise ValueError(f"Payment failed: {payment_result['message']}")
         
-        return response
+        return event
         
     except Exception as e:
-        print(f"Error processing payment: {str(e)}")
+        logger.error("Error processing payment: %s", e)
         raise
 
 
@@ -109,14 +117,16 @@ def process_payment(order_id: str, user_id: str, amount: float) -> Dict[str, Any
     For testing, this mock:
     - Simulates 90% success rate
     - Generates fake transaction IDs
-    - Adds realistic delays
+    - Optionally simulates gateway latency (PAYMENT_MOCK_DELAY_MS)
     """
     
     # Simulate processing delay (payment gateway response time)
-    time.sleep(0.2)  # 200ms delay
+    if PAYMENT_MOCK_DELAY_MS:
+        time.sleep(PAYMENT_MOCK_DELAY_MS / 1000.0)
     
     # Generate a unique transaction ID
     transaction_id = generate_transaction_id(order_id, user_id)
+    processed_at = datetime.utcnow().isoformat() + 'Z'
     
     # Simulate payment success/failure
     # 90% success rate for realistic testing
@@ -126,7 +136,7 @@ def process_payment(order_id: str, user_id: str, amount: float) -> Dict[str, Any
         return {
             'status': 'success',
             'transactionId': transaction_id,
-            'processedAt': datetime.utcnow().isoformat() + 'Z',
+            'processedAt': processed_at,
             'provider': 'mock-payment-gateway',
             'message': f'Payment of ${amount:.2f} processed successfully',
             'amount': amount,
@@ -147,7 +157,7 @@ def process_payment(order_id: str, user_id: str, amount: float) -> Dict[str, Any
         return {
             'status': 'failed',
             'transactionId': transaction_id,
-            'processedAt': datetime.utcnow().isoformat() + 'Z',
+            'processedAt': processed_at,
             'provider': 'mock-payment-gateway',
             'message': f'Payment failed: {failure_reason}',
             'failureReason': failure_reason,
@@ -161,18 +171,9 @@ def generate_transaction_id(order_id: str, user_id: str) -> str:
     Generate a unique transaction ID
     
     In production, this would come from the payment gateway.
-    For testing, we generate a deterministic but unique ID.
+    For testing, we use 16 random hex characters (64 bits of entropy).
     """
-    # Create a hash from order_id, user_id, and timestamp
-    timestamp = str(int(time.time() * 1000))  # milliseconds
-    data = f"{order_id}-{user_id}-{timestamp}"
-    
-    # Generate hash
-    hash_object = hashlib.sha256(data.encode())
-    hash_hex = hash_object.hexdigest()
-    
-    # Return first 16 characters as transaction ID
-    return f"txn-{hash_hex[:16]}"
+    return f"txn-{secrets.token_hex(8)}"
 
 
 def refund_payment(transaction_id: str, amount: float) -> Dict[str, Any]:
@@ -187,9 +188,10 @@ def refund_payment(transaction_id: str, amount: float) -> Dict[str, Any]:
     2. Return refund confirmation
     """
     
-    print(f"Processing refund for transaction {transaction_id}")
+    logger.info("Processing refund for transaction %s", transaction_id)
     
-    time.sleep(0.1)  # Simulate API call
+    if PAYMENT_MOCK_DELAY_MS:
+        time.sleep(PAYMENT_MOCK_DELAY_MS / 1000.0)  # Simulate API call
     
     refund_id = f"ref-{transaction_id[4:]}"  # Remove 'txn-' and add 'ref-'
     
@@ -11,22 +11,67 @@ It checks:
 This function is called by Step Functions as part of the order workflow.
 """
 
-import json
+import logging
 import os
+import random
+import time
 import boto3
-from decimal import Decimal
-from typing import Dict, Any, List
+import orjson
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from botocore.config import Config
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Any, List, Optional
+
+# Shared client config: pooled keep-alive connections are reused across warm invocations
+BOTO_CONFIG = Config(
+    max_pool_connections=50,
+    retries={'mode': 'adaptive', 'max_attempts': 3},
+    tcp_keepalive=True
+)
 
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
-products_table = dynamodb.Table(os.environ['PRODUCTS_TABLE'])
+dynamodb = boto3.resource('dynamodb', config=BOTO_CONFIG)
+PRODUCTS_TABLE = os.environ['PRODUCTS_TABLE']
+products_table = dynamodb.Table(PRODUCTS_TABLE)
+
+# DynamoDB BatchGetItem accepts at most 100 keys per request; larger orders
+# are split into chunks fetched concurrently (boto3 clients are thread-safe)
+BATCH_GET_LIMIT = 100
+MAX_FETCH_WORKERS = 8
+
+# Unprocessed keys (usually throttling) are retried with exponential backoff
+# and full jitter: up to BATCH_GET_MAX_ATTEMPTS requests per chunk
+BATCH_GET_MAX_ATTEMPTS = 4
+BATCH_GET_BASE_DELAY = 0.05
+
+# Validation only reads these attributes, so skip descriptions, images, etc.
+PRODUCT_PROJECTION_NAMES = {'#id': 'productId', '#price': 'price', '#stock': 'stock'}
+fetch_executor = ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS)
+
+# Runs the per-invocation background fetch_products call. Kept apart from
+# fetch_executor so the prefetch never waits on chunk tasks queued in its own pool
+prefetch_executor = ThreadPoolExecutor(max_workers=1)
+
+# Warm-container product cache (productId -> (fetched_at, item)). Kept short
+# because stock levels are checked against it.
+PRODUCT_CACHE_TTL = float(os.environ.get('PRODUCT_CACHE_TTL', '5'))
+_product_cache = {}
 
-# Custom JSON encoder to handle Decimal types from DynamoDB
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
+# Fields every order must carry (a tuple keeps error messages in a stable order)
+REQUIRED_FIELDS = ('orderId', 'userId', 'items', 'totalAmount')
+
+# Largest price difference (1 cent) still treated as a match
+PRICE_TOLERANCE = Decimal('0.01')
+
+# Event payloads are only dumped at DEBUG; set LOG_LEVEL=DEBUG to see them
+logger = logging.getLogger()
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+
+# orjson fallback to handle Decimal types from DynamoDB
+def decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 
 def lambda_handler(event, context):
@@ -57,15 +102,32 @@ def lambda_handler(event, context):
     }
     """
     
-    print(f"Received order validation request: {json.dumps(event, cls=DecimalEncoder)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received order validation request: %s", orjson.dumps(event, default=decimal_default).decode())
+    items = event.get('items')
+    logger.info(
+        "Validating order_id=%s user_id=%s items=%d",
+        event.get('orderId'), event.get('userId'), len(items) if isinstance(items, list) else 0
+    )
     
     try:
+        # Start the product lookup (the only I/O-bound phase) in the background
+        # so it overlaps with the CPU-only field checks below
+        products_future = None
+        if isinstance(items, list) and items:
+            products_future = prefetch_executor.submit(fetch_products, item_product_ids(items))
+        
         # Step 1: Validate required fields
         validation_errors = validate_required_fields(event)
         
-        if not validation_errors:
+        if validation_errors:
+            # The prefetch result is unused; don't leave it running into the
+            # next (thawed) invocation
+            if products_future is not None and not products_future.cancel():
+                wait((products_future,))
+        else:
             # Step 2: Validate items against product database
-            item_errors = validate_items(event.get('items', []))
+            item_errors = validate_items(event.get('items', []), products_future)
             validation_errors.extend(item_errors)
         
         if not validation_errors:
@@ -76,27 +138,25 @@ def lambda_handler(event, context):
         # Build response
         is_valid = len(validation_errors) == 0
         
-        response = {
-            **event,  # Include all original fields
-            'validationResult': {
-                'isValid': is_valid,
-                'errors': validation_errors,
-                'validatedAt': context.request_id,
-                'validatedBy': context.function_name
-            }
+        # Attach the result to the input in place rather than copying it
+        event['validationResult'] = {
+            'isValid': is_valid,
+            'errors': validation_errors,
+            'validatedAt': context.request_id,
+            'validatedBy': context.function_name
         }
         
         if is_valid:
-            print(f"✅ Order {event.get('orderId')} validated successfully")
+            logger.info("✅ Order %s validated successfully", event.get('orderId'))
         else:
-            print(f"❌ Order {event.get('orderId')} validation failed: {validation_errors}")
+            logger.warning("❌ Order %s validation failed: %s", event.get('orderId'), validation_errors)
             # Raise exception so Step Functions can catch it
             raise ValueError(f"Order validation failed: {', '.join(validation_errors)}")
         
-        return response
+        return event
         
     except Exception as e:
-        print(f"Error validating order: {str(e)}")
+        logger.error("Error validating order: %s", e)
         raise
 
 
@@ -110,12 +170,11 @@ def validate_required_fields(order: Dict[str, Any]) -> List[str]:
     - items: Array of order items
     - totalAmount: Total order amount
     """
-    errors = []
-    required_fields = ['orderId', 'userId', 'items', 'totalAmount']
-    
-    for field in required_fields:
-        if field not in order or order[field] is None:
-            errors.append(f"Missing required field: {field}")
+    errors = [
+        f"Missing required field: {field}"
+        for field in REQUIRED_FIELDS
+        if order.get(field) is None
+    ]
     
     # Validate items is an array and not empty
     if 'items' in order:
@@ -127,16 +186,97 @@ def validate_required_fields(order: Dict[str, Any]) -> List[str]:
     return errors
 
 
-def validate_items(items: List[Dict[str, Any]]) -> List[str]:
+def fetch_products(product_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch products by ID with BatchGetItem (one round-trip per 100 keys,
+    issued in parallel when there is more than one chunk)
+    Returns a map of productId -> product item; missing products are absent.
+    """
+    products = {}
+    now = time.monotonic()
+    keys = []
+    
+    # Serve recently fetched products from the cache, batch-fetch the rest
+    for product_id in dict.fromkeys(product_ids):
+        cached = _product_cache.get(product_id)
+        if cached and now - cached[0] < PRODUCT_CACHE_TTL:
+            products[product_id] = cached[1]
+        else:
+            keys.append({'productId': product_id})
+    
+    chunks = [keys[start:start + BATCH_GET_LIMIT] for start in range(0, len(keys), BATCH_GET_LIMIT)]
+    if len(chunks) > 1:
+        results = fetch_executor.map(batch_get_products, chunks)
+    else:
+        results = map(batch_get_products, chunks)
+    
+    for chunk_products in results:
+        for product in chunk_products:
+            products[product['productId']] = product
+            _product_cache[product['productId']] = (now, product)
+    
+    return products
+
+
+def batch_get_products(keys: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Run a single BatchGetItem request (at most 100 keys)
+    Uses the low-level client, which is safe to call from worker threads.
+    Raises RuntimeError if keys are still unprocessed after the last retry.
+    """
+    products = []
+    request_items = {
+        PRODUCTS_TABLE: {
+            'Keys': keys,
+            'ConsistentRead': False,
+            'ProjectionExpression': '#id, #price, #stock',
+            'ExpressionAttributeNames': PRODUCT_PROJECTION_NAMES
+        }
+    }
+    
+    # Retry any keys DynamoDB could not process (throttling, size limits)
+    for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(random.uniform(0, BATCH_GET_BASE_DELAY * 2 ** attempt))
+        result = dynamodb.meta.client.batch_get_item(RequestItems=request_items)
+        products.extend(result.get('Responses', {}).get(PRODUCTS_TABLE, []))
+        request_items = result.get('UnprocessedKeys')
+        if not request_items:
+            return products
+    
+    raise RuntimeError(
+        f"{len(request_items[PRODUCTS_TABLE]['Keys'])} products still unprocessed "
+        f"after {BATCH_GET_MAX_ATTEMPTS} BatchGetItem attempts"
+    )
+
+
+def item_product_ids(items: List[Dict[str, Any]]) -> List[str]:
+    """Collect the product IDs referenced by the order items"""
+    return [item['productId'] for item in items if isinstance(item, dict) and 'productId' in item]
+
+
+def validate_items(items: List[Dict[str, Any]], products_future: Optional[Future] = None) -> List[str]:
     """
     Validate each item in the order
     Checks:
     1. Product exists in database
     2. Quantity is valid
     3. Price matches database
+    
+    products_future, if given, is an in-flight fetch_products call for these items.
     """
     errors = []
     
+    # Look up every referenced product in a single batch
+    try:
+        if products_future is not None:
+            products = products_future.result()
+        else:
+            products = fetch_products(item_product_ids(items))
+    except Exception as e:
+        logger.error("Error fetching products: %s", e)
+        return [f"Error validating products - {str(e)}"]
+    
     for idx, item in enumerate(items):
         item_num = idx + 1
         
@@ -159,17 +299,12 @@ def validate_items(items: List[Dict[str, Any]]) -> List[str]:
             continue
         
         # Check product exists in database
+        product = products.get(item['productId'])
+        if product is None:
+            errors.append(f"Item {item_num}: Product {item['productId']} not found")
+            continue
+        
         try:
-            response = products_table.get_item(
-                Key={'productId': item['productId']}
-            )
-            
-            if 'Item' not in response:
-                errors.append(f"Item {item_num}: Product {item['productId']} not found")
-                continue
-            
-            product = response['Item']
-            
             # Check stock availability (if tracked)
             if 'stock' in product:
                 available_stock = int(product['stock'])
@@ -180,19 +315,22 @@ def validate_items(items: List[Dict[str, Any]]) -> List[str]:
                     )
             
             # Validate price (if provided in order)
+            # DynamoDB returns prices as Decimal, so compare in Decimal directly
             if 'price' in item:
-                db_price = float(product.get('price', 0))
-                order_price = float(item['price'])
+                db_price = Decimal(product.get('price', 0))
+                order_price = Decimal(str(item['price']))
                 
-                # Allow small floating point differences
-                if abs(db_price - order_price) > 0.01:
+                # Allow small rounding differences
+                if abs(db_price - order_price) > PRICE_TOLERANCE:
                     errors.append(
                         f"Item {item_num}: Price mismatch for {item['productId']} "
                         f"(expected: {db_price}, received: {order_price})"
                     )
                     
+        except InvalidOperation:
+            errors.append(f"Item {item_num}: Invalid price")
         except Exception as e:
-            print(f"Error validating product {item['productId']}: {str(e)}")
+            logger.error("Error validating product %s: %s", item['productId'], e)
             errors.append(f"Item {item_num}: Error validating product - {str(e)}")
     
     return errors
@@ -201,27 +339,33 @@ def validate_items(items: List[Dict[str, Any]]) -> List[str]:
 def validate_total_amount(order: Dict[str, Any]) -> List[str]:
     """
     Validate that the total amount matches the sum of item prices
+    
+    Amounts are summed as Decimals (parsed from their string form) so the
+    comparison is exact money arithmetic rather than accumulated float error.
     """
     errors = []
     
     try:
-        calculated_total = 0.0
-        
-        for item in order.get('items', []):
-            if 'price' in item and 'quantity' in item:
-                price = float(item['price'])
-                quantity = int(item['quantity'])
-                calculated_total += price * quantity
+        calculated_total = sum(
+            (
+                Decimal(str(item['price'])) * int(item['quantity'])
+                for item in order.get('items', [])
+                if 'price' in item and 'quantity' in item
+            ),
+            Decimal(0)
+        )
         
-        order_total = float(order.get('totalAmount', 0))
+        order_total = Decimal(str(order.get('totalAmount', 0)))
         
-        # Allow small floating point differences (1 cent)
-        if abs(calculated_total - order_total) > 0.01:
+        # Allow small rounding differences (1 cent)
+        if abs(calculated_total - order_total) > PRICE_TOLERANCE:
             errors.append(
                 f"Total amount mismatch: expected {calculated_total:.2f}, "
                 f"received {order_total:.2f}"
             )
             
+    except InvalidOperation:
+        errors.append("Error calculating total: invalid price or total amount")
     except Exception as e:
         errors.append(f"Error calculating total: {str(e)}")
     
@@ -250,4 +394,4 @@ if __name__ == "__main__":
         function_name = "test-validate-order"
     
     result = lambda_handler(test_event, MockContext())
-    print(json.dumps(result, indent=2, cls=DecimalEncoder))
+    print(orjson.dumps(result, default=decimal_default, option=orjson.OPT_INDENT_2).decode())
@@ -8,17 +8,50 @@ Handles user authentication operations including:
 - Password management
 """
 
-import json
+import logging
 import os
 import boto3
+import orjson
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+# Shared client config: pooled keep-alive connections are reused across warm invocations
+BOTO_CONFIG = Config(
+    max_pool_connections=50,
+    retries={'mode': 'adaptive', 'max_attempts': 3},
+    tcp_keepalive=True
+)
+
 # Initialize AWS clients
-cognito_client = boto3.client('cognito-idp')
+cognito_client = boto3.client('cognito-idp', config=BOTO_CONFIG)
 
-USER_POOL_ID = os.environ.get('USER_POOL_ID')
 USER_POOL_CLIENT_ID = os.environ.get('USER_POOL_CLIENT_ID')
 
+# Reject oversized request bodies before parsing them
+MAX_BODY_BYTES = 256 * 1024
+
+# Event payloads are only dumped at DEBUG; set LOG_LEVEL=DEBUG to see them
+logger = logging.getLogger()
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+
+# Cognito error codes mapped to (status_code, body) for each operation
+REGISTER_ERRORS = {
+    'UsernameExistsException': (409, {'error': 'User already exists'}),
+    'InvalidPasswordException': (400, {'error': 'Invalid password format'})
+}
+LOGIN_ERRORS = {
+    'NotAuthorizedException': (401, {'error': 'Invalid email or password'}),
+    'UserNotFoundException': (401, {'error': 'Invalid email or password'})
+}
+
+# CORS headers shared by every API Gateway response
+RESPONSE_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+    'Access-Control-Allow-Methods': 'POST,OPTIONS'
+}
+
 
 def lambda_handler(event, context):
     """
@@ -33,11 +66,15 @@ def lambda_handler(event, context):
     }
     """
     
-    print(f"Received event: {json.dumps(event)}")
+    # The body carries credentials, so the full event is only logged at DEBUG
+    logger.debug("Received event: %s", event)
     
     try:
         # Parse request body
-        body = json.loads(event.get('body', '{}'))
+        body, error = parse_body(event)
+        if error:
+            return error
+        
         action = body.get('action', '')
         
         if action == 'register':
@@ -50,7 +87,7 @@ def lambda_handler(event, context):
             return response(400, {'error': 'Invalid action. Use: register, login, or refresh'})
     
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logger.error("Error: %s", e)
         return response(500, {'error': 'Internal server error', 'message': str(e)})
 
 
@@ -64,7 +101,7 @@ def handle_register(body):
         return response(400, {'error': 'Missing required fields: email, password, name'})
     
     try:
-        # Create user in Cognito
+        # Create user in Cognito (the PreSignUp trigger auto-confirms it)
         response_data = cognito_client.sign_up(
             ClientId=USER_POOL_CLIENT_ID,
             Username=email,
@@ -75,12 +112,6 @@ def handle_register(body):
             ]
         )
         
-        # Automatically confirm the user for a smoother registration flow
-        cognito_client.admin_confirm_sign_up(
-            UserPoolId=USER_POOL_ID,
-            Username=email
-        )
-        
         return response(201, {
             'message': 'User registered successfully',
             'userId': response_data['UserSub'],
@@ -88,13 +119,10 @@ def handle_register(body):
         })
     
     except ClientError as e:
-        error_code = e.response['Error']['Code']
-        if error_code == 'UsernameExistsException':
-            return response(409, {'error': 'User already exists'})
-        elif error_code == 'InvalidPasswordException':
-            return response(400, {'error': 'Invalid password format'})
-        else:
-            raise
+        mapped = REGISTER_ERRORS.get(e.response['Error']['Code'])
+        if mapped:
+            return response(*mapped)
+        raise
 
 
 def handle_login(body):
@@ -107,10 +135,9 @@ def handle_login(body):
     
     try:
         # Authenticate user
-        auth_response = cognito_client.admin_initiate_auth(
-            UserPoolId=USER_POOL_ID,
+        auth_response = cognito_client.initiate_auth(
             ClientId=USER_POOL_CLIENT_ID,
-            AuthFlow='ADMIN_NO_SRP_AUTH',
+            AuthFlow='USER_PASSWORD_AUTH',
             AuthParameters={
                 'USERNAME': email,
                 'PASSWORD': password
@@ -126,11 +153,10 @@ def handle_login(body):
         })
     
     except ClientError as e:
-        error_code = e.response['Error']['Code']
-        if error_code in ['NotAuthorizedException', 'UserNotFoundException']:
-            return response(401, {'error': 'Invalid email or password'})
-        else:
-            raise
+        mapped = LOGIN_ERRORS.get(e.response['Error']['Code'])
+        if mapped:
+            return response(*mapped)
+        raise
 
 
 def handle_refresh(body):
@@ -141,8 +167,7 @@ def handle_refresh(body):
         return response(400, {'error': 'Missing refreshToken'})
     
     try:
-        auth_response = cognito_client.admin_initiate_auth(
-            UserPoolId=USER_POOL_ID,
+        auth_response = cognito_client.initiate_auth(
             ClientId=USER_POOL_CLIENT_ID,
             AuthFlow='REFRESH_TOKEN_AUTH',
             AuthParameters={
@@ -161,15 +186,28 @@ def handle_refresh(body):
         return response(401, {'error': 'Invalid or expired refresh token'})
 
 
+def parse_body(event):
+    """Parse the JSON request body; returns (body, error_response)"""
+    raw = event.get('body') or '{}'
+    # A character is at least one UTF-8 byte, so only non-ASCII bodies need encoding
+    if len(raw) > MAX_BODY_BYTES or (not raw.isascii() and len(raw.encode()) > MAX_BODY_BYTES):
+        return None, response(413, {'error': 'Request body too large'})
+    
+    try:
+        body = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return None, response(400, {'error': 'Invalid JSON body'})
+    
+    if not isinstance(body, dict):
+        return None, response(400, {'error': 'Request body must be a JSON object'})
+    
+    return body, None
+
+
 def response(status_code, body):
     """Generate API Gateway response"""
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-            'Access-Control-Allow-Methods': 'POST,OPTIONS'
-        },
-        'body': json.dumps(body)
+        'headers': RESPONSE_HEADERS,
+        'body': orjson.dumps(body).decode()
     }
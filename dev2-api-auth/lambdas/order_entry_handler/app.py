@@ -5,22 +5,69 @@ Developer 2: API & Authentication
 Receives new order requests and queues them for processing via SQS
 """
 
-import json
+import logging
 import os
+import random
+import time
 import uuid
 from datetime import datetime
 import boto3
-from botocore.exceptions import ClientError
+import orjson
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+# Shared client config: pooled keep-alive connections are reused across warm invocations
+BOTO_CONFIG = Config(
+    max_pool_connections=50,
+    retries={'mode': 'adaptive', 'max_attempts': 3},
+    tcp_keepalive=True
+)
 
 # Initialize AWS clients
-sqs_client = boto3.client('sqs')
-dynamodb = boto3.resource('dynamodb')
+sqs_client = boto3.client('sqs', config=BOTO_CONFIG)
+dynamodb = boto3.resource('dynamodb', config=BOTO_CONFIG)
 
 ORDER_QUEUE_URL = os.environ.get('ORDER_QUEUE_URL')
 PRODUCTS_TABLE = os.environ.get('PRODUCTS_TABLE')
 
+# Reject oversized request bodies before parsing them
+MAX_BODY_BYTES = 256 * 1024
+
 products_table = dynamodb.Table(PRODUCTS_TABLE)
 
+# DynamoDB BatchGetItem accepts at most 100 keys per request
+BATCH_GET_LIMIT = 100
+
+# Unprocessed keys (usually throttling) are retried with exponential backoff
+# and full jitter: up to BATCH_GET_MAX_ATTEMPTS requests per chunk
+BATCH_GET_MAX_ATTEMPTS = 4
+BATCH_GET_BASE_DELAY = 0.05
+
+# Pricing only needs these attributes, so skip descriptions, images, etc.
+PRODUCT_PROJECTION_NAMES = {'#id': 'productId', '#price': 'price'}
+
+# SQS SendMessageBatch accepts at most 10 entries per request
+SQS_BATCH_LIMIT = 10
+
+# Largest number of orders accepted in one bulk request
+MAX_BULK_ORDERS = 100
+
+# Warm-container product cache (productId -> (fetched_at, item)) for price lookups
+PRODUCT_CACHE_TTL = float(os.environ.get('PRODUCT_CACHE_TTL', '60'))
+_product_cache = {}
+
+# Event payloads are only dumped at DEBUG; set LOG_LEVEL=DEBUG to see them
+logger = logging.getLogger()
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+
+# CORS headers shared by every API Gateway response
+RESPONSE_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+    'Access-Control-Allow-Methods': 'POST,OPTIONS'
+}
+
 
 def lambda_handler(event, context):
     """
@@ -42,79 +89,54 @@ def lambda_handler(event, context):
             "zip": "02101"
         }
     }
+    
+    Bulk requests wrap several such orders in an "orders" array:
+    {
+        "orders": [{"items": [...], "shippingAddress": {...}}, ...]
+    }
     """
     
-    print(f"Received event: {json.dumps(event)}")
+    logger.debug("Received event: %s", event)
     
     try:
         # Parse request body
-        body = json.loads(event.get('body', '{}'))
+        body, error = parse_body(event)
+        if error:
+            return error
         
         # Extract user ID from Cognito authorizer context
-        user_id = extract_user_id(event)
+        user_id = extract_user_id(event, body)
         
-        # Validate required fields
-        items = body.get('items', [])
-        shipping_address = body.get('shippingAddress', {})
+        if isinstance(body.get('orders'), list):
+            return handle_bulk_orders(body['orders'], user_id)
         
-        if not items:
-            return response(400, {'error': 'Order must contain at least one item'})
+        # Validate required fields
+        error = validate_order_request(body)
+        if error:
+            return response(error[0], {'error': error[1]})
         
-        if not shipping_address:
-            return response(400, {'error': 'Shipping address is required'})
+        items = body['items']
         
-        # Validate products exist (basic check)
-        total_amount = 0.0
-        for item in items:
-            product_id = item.get('productId')
-            quantity = item.get('quantity', 0)
-            
-            if not product_id or quantity <= 0:
-                return response(400, {'error': 'Invalid item in order'})
-            
-            # Check if product exists (placeholder - implement actual price lookup)
-            try:
-                product = products_table.get_item(Key={'productId': product_id})
-                if 'Item' not in product:
-                    return response(404, {'error': f'Product {product_id} not found'})
-                
-                # Calculate total (assuming product has 'price' field)
-                price = float(product['Item'].get('price', 0))
-                total_amount += price * quantity
-            except Exception as e:
-                print(f"Error fetching product {product_id}: {str(e)}")
-                # Continue for hackathon - in production, fail immediately
+        # Validate products exist and calculate total
+        products, error = load_products(items)
+        if error:
+            return response(error[0], {'error': error[1]})
+        total_amount, error = calculate_total(items, products)
+        if error:
+            return response(error[0], {'error': error[1]})
         
         # Create order object
-        order_id = str(uuid.uuid4())
-        order = {
-            'orderId': order_id,
-            'userId': user_id,
-            'items': items,
-            'shippingAddress': shipping_address,
-            'totalAmount': total_amount,
-            'status': 'PENDING',
-            'createdAt': datetime.utcnow().isoformat(),
-            'updatedAt': datetime.utcnow().isoformat()
-        }
+        order = build_order(body, user_id, total_amount, datetime.utcnow().isoformat())
+        order_id = order['orderId']
         
         # Send order to SQS for processing
         sqs_response = sqs_client.send_message(
             QueueUrl=ORDER_QUEUE_URL,
-            MessageBody=json.dumps(order),
-            MessageAttributes={
-                'orderId': {
-                    'StringValue': order_id,
-                    'DataType': 'String'
-                },
-                'userId': {
-                    'StringValue': user_id,
-                    'DataType': 'String'
-                }
-            }
+            MessageBody=orjson.dumps(order).decode(),
+            MessageAttributes=message_attributes(order)
         )
         
-        print(f"Order {order_id} sent to SQS: {sqs_response['MessageId']}")
+        logger.info("Order %s sent to SQS: %s", order_id, sqs_response['MessageId'])
         
         return response(201, {
             'message': 'Order created successfully',
@@ -125,11 +147,220 @@ def lambda_handler(event, context):
         })
     
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logger.error("Error: %s", e)
         return response(500, {'error': 'Internal server error', 'message': str(e)})
 
 
-def extract_user_id(event):
+def handle_bulk_orders(order_requests, user_id):
+    """Validate several orders and queue them with SendMessageBatch (10 per call)"""
+    if not order_requests:
+        return response(400, {'error': 'Bulk request must contain at least one order'})
+    
+    if len(order_requests) > MAX_BULK_ORDERS:
+        return response(400, {'error': f'Bulk request may contain at most {MAX_BULK_ORDERS} orders'})
+    
+    for idx, order_request in enumerate(order_requests):
+        if not isinstance(order_request, dict):
+            return response(400, {'error': 'Invalid order in bulk request', 'orderIndex': idx})
+        error = validate_order_request(order_request)
+        if error:
+            return response(error[0], {'error': error[1], 'orderIndex': idx})
+    
+    # One product lookup covers every order in the request
+    products, error = load_products([item for order_request in order_requests for item in order_request['items']])
+    if error:
+        return response(error[0], {'error': error[1]})
+    
+    # Orders submitted together share one creation timestamp
+    created_at = datetime.utcnow().isoformat()
+    orders = []
+    for idx, order_request in enumerate(order_requests):
+        total_amount, error = calculate_total(order_request['items'], products)
+        if error:
+            return response(error[0], {'error': error[1], 'orderIndex': idx})
+        orders.append(build_order(order_request, user_id, total_amount, created_at))
+    
+    created = []
+    failed = []
+    for start in range(0, len(orders), SQS_BATCH_LIMIT):
+        batch = orders[start:start + SQS_BATCH_LIMIT]
+        try:
+            sqs_response = sqs_client.send_message_batch(
+                QueueUrl=ORDER_QUEUE_URL,
+                Entries=[
+                    {
+                        'Id': str(idx),
+                        'MessageBody': orjson.dumps(order).decode(),
+                        'MessageAttributes': message_attributes(order)
+                    }
+                    for idx, order in enumerate(batch)
+                ]
+            )
+        except (BotoCoreError, ClientError) as e:
+            # Earlier batches are already queued, so report this one as failed
+            # rather than losing their orderIds in a 500
+            logger.error("Batch of %d orders failed to queue: %s", len(batch), e)
+            failed.extend({'orderId': order['orderId'], 'error': str(e)} for order in batch)
+            continue
+        
+        for entry in sqs_response.get('Successful', []):
+            order = batch[int(entry['Id'])]
+            created.append({
+                'orderId': order['orderId'],
+                'status': 'PENDING',
+                'totalAmount': order['totalAmount'],
+                'sqsMessageId': entry['MessageId']
+            })
+        
+        for entry in sqs_response.get('Failed', []):
+            order = batch[int(entry['Id'])]
+            logger.error("Order %s failed to queue: %s", order['orderId'], entry.get('Message'))
+            failed.append({
+                'orderId': order['orderId'],
+                'error': entry.get('Message', entry.get('Code'))
+            })
+    
+    logger.info("Bulk request queued %d orders (%d failed)", len(created), len(failed))
+    
+    # 207 Multi-Status when only part of the batch was queued
+    return response(207 if failed else 201, {
+        'message': 'Orders created successfully' if not failed else 'Some orders could not be queued',
+        'orders': created,
+        'failed': failed
+    })
+
+
+def validate_order_request(order_request):
+    """Check items and shipping address; returns (status_code, message) on error"""
+    items = order_request.get('items', [])
+    shipping_address = order_request.get('shippingAddress', {})
+    
+    if not items:
+        return 400, 'Order must contain at least one item'
+    
+    if not shipping_address:
+        return 400, 'Shipping address is required'
+    
+    for item in items:
+        product_id = item.get('productId')
+        quantity = item.get('quantity', 0)
+        
+        if not product_id or not isinstance(product_id, str) or quantity <= 0:
+            return 400, 'Invalid item in order'
+    
+    return None
+
+
+def load_products(items):
+    """
+    Look up all products referenced by the items in a single batch
+    Returns (products, error) where error is (status_code, message); orders
+    are never priced without their products.
+    """
+    try:
+        return fetch_products([item['productId'] for item in items]), None
+    except ClientError as e:
+        logger.error("Error fetching products: %s", e)
+        if e.response['Error']['Code'] == 'ValidationException':
+            return None, (400, 'Invalid productId in order')
+        return None, (503, 'Product lookup failed, please retry')
+    except Exception as e:
+        logger.error("Error fetching products: %s", e)
+        return None, (503, 'Product lookup failed, please retry')
+
+
+def calculate_total(items, products):
+    """Price the items; returns (total_amount, error) where error is (status_code, message)"""
+    total_amount = 0.0
+    for item in items:
+        product_id = item['productId']
+        product = products.get(product_id)
+        if product is None:
+            return total_amount, (404, f'Product {product_id} not found')
+        
+        # Calculate total (assuming product has 'price' field)
+        price = float(product.get('price', 0))
+        total_amount += price * item['quantity']
+    
+    return total_amount, None
+
+
+def build_order(order_request, user_id, total_amount, created_at):
+    """Create the order message sent to SQS (a new order's updatedAt equals createdAt)"""
+    return {
+        'orderId': str(uuid.uuid4()),
+        'userId': user_id,
+        'items': order_request['items'],
+        'shippingAddress': order_request['shippingAddress'],
+        'totalAmount': total_amount,
+        'status': 'PENDING',
+        'createdAt': created_at,
+        'updatedAt': created_at
+    }
+
+
+def message_attributes(order):
+    """SQS message attributes used to route and trace an order"""
+    return {
+        'orderId': {
+            'StringValue': order['orderId'],
+            'DataType': 'String'
+        },
+        'userId': {
+            'StringValue': order['userId'],
+            'DataType': 'String'
+        }
+    }
+
+
+def fetch_products(product_ids):
+    """
+    Fetch products by ID with BatchGetItem, returning productId -> item
+    Raises RuntimeError if keys are still unprocessed after the last retry.
+    """
+    products = {}
+    now = time.monotonic()
+    keys = []
+    
+    # Serve recently fetched products from the cache, batch-fetch the rest
+    for product_id in dict.fromkeys(product_ids):
+        cached = _product_cache.get(product_id)
+        if cached and now - cached[0] < PRODUCT_CACHE_TTL:
+            products[product_id] = cached[1]
+        else:
+            keys.append({'productId': product_id})
+    
+    for start in range(0, len(keys), BATCH_GET_LIMIT):
+        request_items = {
+            PRODUCTS_TABLE: {
+                'Keys': keys[start:start + BATCH_GET_LIMIT],
+                'ConsistentRead': False,
+                'ProjectionExpression': '#id, #price',
+                'ExpressionAttributeNames': PRODUCT_PROJECTION_NAMES
+            }
+        }
+        
+        # Retry any keys DynamoDB could not process (throttling, size limits)
+        for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(random.uniform(0, BATCH_GET_BASE_DELAY * 2 ** attempt))
+            result = dynamodb.batch_get_item(RequestItems=request_items)
+            for product in result.get('Responses', {}).get(PRODUCTS_TABLE, []):
+                products[product['productId']] = product
+                _product_cache[product['productId']] = (now, product)
+            request_items = result.get('UnprocessedKeys')
+            if not request_items:
+                break
+        else:
+            raise RuntimeError(
+                f"{len(request_items[PRODUCTS_TABLE]['Keys'])} products still unprocessed "
+                f"after {BATCH_GET_MAX_ATTEMPTS} BatchGetItem attempts"
+            )
+    
+    return products
+
+
+def extract_user_id(event, body):
     """Extract user ID from API Gateway authorizer context"""
     try:
         # From Cognito authorizer
@@ -137,19 +368,31 @@ def extract_user_id(event):
         return claims.get('sub', 'anonymous')
     except (KeyError, TypeError):
         # Fallback for testing without auth
-        body = json.loads(event.get('body', '{}'))
         return body.get('userId', 'test-user')
 
 
+def parse_body(event):
+    """Parse the JSON request body; returns (body, error_response)"""
+    raw = event.get('body') or '{}'
+    # A character is at least one UTF-8 byte, so only non-ASCII bodies need encoding
+    if len(raw) > MAX_BODY_BYTES or (not raw.isascii() and len(raw.encode()) > MAX_BODY_BYTES):
+        return None, response(413, {'error': 'Request body too large'})
+    
+    try:
+        body = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return None, response(400, {'error': 'Invalid JSON body'})
+    
+    if not isinstance(body, dict):
+        return None, response(400, {'error': 'Request body must be a JSON object'})
+    
+    return body, None
+
+
 def response(status_code, body):
     """Generate API Gateway response"""
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-            'Access-Control-Allow-Methods': 'POST,OPTIONS'
-        },
-        'body': json.dumps(body)
+        'headers': RESPONSE_HEADERS,
+        'body': orjson.dumps(body).decode()
     }
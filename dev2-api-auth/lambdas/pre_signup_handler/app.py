@@ -0,0 +1,18 @@
+"""
+Pre Sign-Up Trigger Lambda Function
+Developer 2: API & Authentication
+
+Cognito PreSignUp trigger that auto-confirms new users, so registration
+completes with a single sign_up call from the auth handler
+"""
+
+
+def lambda_handler(event, context):
+    """
+    Cognito PreSignUp trigger handler
+    
+    Cognito passes the sign-up request and expects the same event back;
+    setting response.autoConfirmUser marks the new user as confirmed.
+    """
+    event['response']['autoConfirmUser'] = True
+    return event
@@ -5,25 +5,51 @@ Developer 3: Data & Media Management
 Retrieves product list from DynamoDB
 """
 
-import json
+import logging
 import os
+import re
 import boto3
+import orjson
+from boto3.dynamodb.conditions import Key
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from decimal import Decimal
 
+# Shared client config: pooled keep-alive connections are reused across warm invocations
+BOTO_CONFIG = Config(
+    max_pool_connections=50,
+    retries={'mode': 'adaptive', 'max_attempts': 3},
+    tcp_keepalive=True
+)
+
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
+dynamodb = boto3.resource('dynamodb', config=BOTO_CONFIG)
 
 PRODUCTS_TABLE = os.environ.get('PRODUCTS_TABLE')
+CATEGORY_INDEX = os.environ.get('CATEGORY_INDEX', 'CategoryIndex')
+
+# Attribute names accepted in the "fields" query parameter
+FIELD_NAME_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]{0,63}$')
 products_table = dynamodb.Table(PRODUCTS_TABLE)
 
+# Event payloads are only dumped at DEBUG; set LOG_LEVEL=DEBUG to see them
+logger = logging.getLogger()
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+
+
+def decimal_default(obj):
+    """orjson fallback to convert DynamoDB Decimal types to JSON"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
-class DecimalEncoder(json.JSONEncoder):
-    """Helper class to convert DynamoDB Decimal types to JSON"""
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
+# CORS headers shared by every API Gateway response
+RESPONSE_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+    'Access-Control-Allow-Methods': 'GET,OPTIONS'
+}
 
 
 def lambda_handler(event, context):
@@ -34,9 +60,10 @@ def lambda_handler(event, context):
     - category: Filter by category (optional)
     - limit: Number of items to return (default: 50)
     - lastKey: For pagination (optional)
+    - fields: Comma-separated attributes to return, e.g. name,price (optional)
     """
     
-    print(f"Received event: {json.dumps(event)}")
+    logger.debug("Received event: %s", event)
     
     try:
         # Parse query parameters
@@ -44,26 +71,38 @@ def lambda_handler(event, context):
         category = params.get('category')
         limit = int(params.get('limit', 50))
         last_key = params.get('lastKey')
+        fields = params.get('fields')
         
         # Build scan/query parameters
-        scan_params = {
+        read_params = {
             'Limit': min(limit, 100)  # Cap at 100
         }
         
         # Add pagination token if provided
         if last_key:
             try:
-                scan_params['ExclusiveStartKey'] = json.loads(last_key)
-            except json.JSONDecodeError:
+                read_params['ExclusiveStartKey'] = orjson.loads(last_key)
+            except orjson.JSONDecodeError:
                 return response(400, {'error': 'Invalid lastKey format'})
         
-        # Add category filter if provided
-        if category:
-            scan_params['FilterExpression'] = 'category = :cat'
-            scan_params['ExpressionAttributeValues'] = {':cat': category}
+        # Only read the requested attributes (placeholders avoid reserved words like "name")
+        if fields:
+            names = [name.strip() for name in fields.split(',') if name.strip()]
+            if not names or not all(FIELD_NAME_PATTERN.match(name) for name in names):
+                return response(400, {'error': 'Invalid fields format'})
+            read_params['ProjectionExpression'] = ', '.join(f'#f{idx}' for idx in range(len(names)))
+            read_params['ExpressionAttributeNames'] = {f'#f{idx}': name for idx, name in enumerate(names)}
         
-        # Scan DynamoDB table
-        result = products_table.scan(**scan_params)
+        # Query the category index when filtering, so only matching items are read;
+        # otherwise page through the whole table
+        if category:
+            result = products_table.query(
+                IndexName=CATEGORY_INDEX,
+                KeyConditionExpression=Key('category').eq(category),
+                **read_params
+            )
+        else:
+            result = products_table.scan(**read_params)
         
         products = result.get('Items', [])
         last_evaluated_key = result.get('LastEvaluatedKey')
@@ -77,7 +116,7 @@ def lambda_handler(event, context):
         
         # Add pagination info if there are more items
         if last_evaluated_key:
-            response_body['lastKey'] = json.dumps(last_evaluated_key, cls=DecimalEncoder)
+            response_body['lastKey'] = orjson.dumps(last_evaluated_key, default=decimal_default).decode()
             response_body['hasMore'] = True
         else:
             response_body['hasMore'] = False
@@ -85,14 +124,14 @@ def lambda_handler(event, context):
         return response(200, response_body)
     
     except ClientError as e:
-        print(f"DynamoDB error: {str(e)}")
+        logger.error("DynamoDB error: %s", e)
         return response(500, {
             'error': 'Database error',
             'message': str(e)
         })
     
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logger.error("Error: %s", e)
         return response(500, {
             'error': 'Internal server error',
             'message': str(e)
@@ -103,11 +142,6 @@ def response(status_code, body):
     """Generate API Gateway response"""
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-            'Access-Control-Allow-Methods': 'GET,OPTIONS'
-        },
-        'body': json.dumps(body, cls=DecimalEncoder)
+        'headers': RESPONSE_HEADERS,
+        'body': orjson.dumps(body, default=decimal_default).decode()
     }
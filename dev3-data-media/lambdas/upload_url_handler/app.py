@@ -5,17 +5,90 @@ Developer 3: Data & Media Management
 Generates S3 pre-signed URLs for product image uploads
 """
 
-import json
+import hashlib
+import hmac
+import logging
 import os
-import uuid
+import secrets
 from datetime import datetime
 import boto3
-from botocore.exceptions import ClientError
+import orjson
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from urllib.parse import quote
 
-# Initialize AWS clients
-s3_client = boto3.client('s3')
+# S3 client config: an explicit region and SigV4 let URLs be signed without
+# endpoint discovery; keep-alive connections are reused across warm invocations
+BOTO_CONFIG = Config(
+    region_name=os.environ.get('AWS_REGION'),
+    signature_version='s3v4',
+    max_pool_connections=10,
+    retries={'mode': 'standard', 'max_attempts': 2},
+    tcp_keepalive=True
+)
+
+# Initialize AWS clients. URLs are normally signed locally, so the S3 client
+# (whose service model is slow to load) is only created if the fallback needs it
+session = boto3.session.Session()
+s3_client = None
 
 PRODUCT_IMAGES_BUCKET = os.environ.get('PRODUCT_IMAGES_BUCKET')
+AWS_REGION = os.environ.get('AWS_REGION')
+BUCKET_URL_PREFIX = f"https://{PRODUCT_IMAGES_BUCKET}.s3.amazonaws.com/"
+
+# Constant part of the put_object Params for the botocore fallback; copied per call
+_PARAMS_TEMPLATE = {'Bucket': PRODUCT_IMAGES_BUCKET}
+
+# With WARM_S3=1 the S3 client is created during init and a HEAD on the bucket
+# opens its keep-alive connection, so the first request that talks to S3 skips
+# the TLS handshake. Off by default since URLs are normally signed locally
+if os.environ.get('WARM_S3') == '1' and PRODUCT_IMAGES_BUCKET:
+    s3_client = session.client('s3', config=BOTO_CONFIG)
+    try:
+        s3_client.head_bucket(Bucket=PRODUCT_IMAGES_BUCKET)
+    except (BotoCoreError, ClientError):
+        pass
+
+# Event payloads are only dumped at DEBUG; set LOG_LEVEL=DEBUG to see them
+logger = logging.getLogger()
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+
+# SigV4 signing key for the current (secret key, UTC date, region); derived once per day
+_signing_key_cache = {}
+
+# Responses for requests that carry an idempotencyKey, so a client retrying
+# within URL_CACHE_TTL seconds gets the same upload URL instead of a new object
+# key. Keyed by (caller sub, idempotencyKey, contentType, extension, expiresIn,
+# includeFileUrl) so keys never match across users; values are (created
+# timestamp, response body). Oldest entries are evicted first
+URL_CACHE_TTL = 10
+URL_CACHE_MAX_ENTRIES = 128
+_url_cache = {}
+
+# Only image uploads are accepted
+ALLOWED_CONTENT_TYPES = frozenset({
+    'image/jpeg',
+    'image/jpg',
+    'image/png',
+    'image/gif',
+    'image/webp'
+})
+
+ALLOWED_EXTENSIONS = frozenset({'jpg', 'jpeg', 'png', 'gif', 'webp'})
+
+# Static upload instructions returned with every pre-signed URL
+UPLOAD_INSTRUCTIONS = {
+    'method': 'PUT',
+    'note': 'Upload the file directly to the uploadUrl using the PUT method. Ensure no extra headers are sent if using binary body.'
+}
+
+# CORS headers shared by every API Gateway response
+RESPONSE_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+    'Access-Control-Allow-Methods': 'GET,OPTIONS'
+}
 
 
 def lambda_handler(event, context):
@@ -26,87 +99,209 @@ def lambda_handler(event, context):
     - filename: Original filename (optional)
     - contentType: MIME type (default: image/jpeg)
     - expiresIn: URL validity in seconds (default: 300, max: 3600)
+    - includeFileUrl: Set to 1 to also return the object's fileUrl (optional)
+    - idempotencyKey: Client request ID; repeats by the same user within URL_CACHE_TTL seconds
+      return the same URL (optional)
     """
     
-    print(f"Received event: {json.dumps(event)}")
+    logger.debug("Received event: %s", event)
     
     try:
+        # One clock read and one random ID per request, reused below
+        now = datetime.utcnow()
+        key_id = secrets.token_urlsafe(16)
+        
         # Parse query parameters
         params = event.get('queryStringParameters') or {}
-        filename = params.get('filename', f'product-{uuid.uuid4()}.jpg')
+        filename = params.get('filename', f'product-{key_id}.jpg')
         content_type = params.get('contentType', 'image/jpeg')
-        expires_in = min(int(params.get('expiresIn', 300)), 3600)  # Max 1 hour
         
-        # Validate content type (only allow images)
-        allowed_types = [
-            'image/jpeg',
-            'image/jpg',
-            'image/png',
-            'image/gif',
-            'image/webp'
-        ]
+        # expiresIn must be a positive integer; values are clamped to 1..3600 (max 1 hour)
+        raw_expires_in = params.get('expiresIn')
+        if raw_expires_in is None:
+            expires_in = 300
+        elif raw_expires_in.isascii() and raw_expires_in.isdigit():
+            expires_in = max(1, min(int(raw_expires_in), 3600))
+        else:
+            return response(400, {
+                'error': 'Invalid expiresIn',
+                'message': 'expiresIn must be a positive integer number of seconds'
+            })
         
-        if content_type not in allowed_types:
+        # Validate content type (only allow images)
+        if content_type not in ALLOWED_CONTENT_TYPES:
             return response(400, {
                 'error': 'Invalid content type',
-                'allowedTypes': allowed_types
+                'allowedTypes': sorted(ALLOWED_CONTENT_TYPES)
             })
         
-        # Generate unique key for S3
-        timestamp = datetime.utcnow().strftime('%Y%m%d')
-        file_extension = filename.split('.')[-1] if '.' in filename else 'jpg'
-        s3_key = f'products/{timestamp}/{uuid.uuid4()}.{file_extension}'
+        # Take the extension after the last dot; only plain image suffixes may
+        # end up in the S3 key
+        _, dot, extension = filename.rpartition('.')
+        file_extension = extension.lower() if dot else 'jpg'
+        if file_extension not in ALLOWED_EXTENSIONS:
+            return response(400, {
+                'error': 'Invalid file extension',
+                'allowedExtensions': sorted(ALLOWED_EXTENSIONS)
+            })
         
-        # Generate pre-signed URL for PUT operation
-        presigned_url = s3_client.generate_presigned_url(
-            'put_object',
-            Params={
-                'Bucket': PRODUCT_IMAGES_BUCKET,
-                'Key': s3_key
-            },
-            ExpiresIn=expires_in,
-            HttpMethod='PUT'
-        )
+        # A retried request gets the cached URL back, with expiresIn counting
+        # down to the original expiresAt
+        include_file_url = params.get('includeFileUrl') in ('1', 'true')
+        idempotency_key = params.get('idempotencyKey')
+        caller = caller_id(event) if idempotency_key else None
+        now_ts = now.timestamp()
+        cache_key = None
+        if caller:
+            cache_key = (caller, idempotency_key, content_type, file_extension, expires_in, include_file_url)
+            cached = _url_cache.get(cache_key)
+            if cached is not None and now_ts - cached[0] < URL_CACHE_TTL:
+                response_body = dict(cached[1])
+                response_body['expiresIn'] = int(response_body['expiresAt'] - now_ts)
+                if response_body['expiresIn'] > 0:
+                    return response(200, response_body)
         
-        # Generate the public URL (for reference, not for direct access)
-        file_url = f"https://{PRODUCT_IMAGES_BUCKET}.s3.amazonaws.com/{s3_key}"
+        # Generate unique key for S3
+        timestamp = f'{now.year:04d}{now.month:02d}{now.day:02d}'
+        s3_key = f'products/{timestamp}/{key_id}.{file_extension}'
         
-        return response(200, {
+        # Generate pre-signed URL for PUT operation, falling back to botocore
+        # when the local signer can't be used
+        presigned_url = presign_put_url(s3_key, expires_in, now)
+        if presigned_url is None:
+            put_params = _PARAMS_TEMPLATE.copy()
+            put_params['Key'] = s3_key
+            presigned_url = get_s3_client().generate_presigned_url(
+                'put_object',
+                Params=put_params,
+                ExpiresIn=expires_in,
+                HttpMethod='PUT'
+            )
+        
+        response_body = {
             'uploadUrl': presigned_url,
-            'fileUrl': file_url,
             'key': s3_key,
             'expiresIn': expires_in,
-            'expiresAt': (datetime.utcnow().timestamp() + expires_in),
-            'instructions': {
-                'method': 'PUT',
-                'note': 'Upload the file directly to the uploadUrl using the PUT method. Ensure no extra headers are sent if using binary body.'
-            }
-        })
+            'expiresAt': (now_ts + expires_in),
+            'instructions': UPLOAD_INSTRUCTIONS
+        }
+        
+        # The public URL (for reference, not for direct access) is derivable from
+        # the key, so it is only returned on request
+        if include_file_url:
+            response_body['fileUrl'] = BUCKET_URL_PREFIX + s3_key
+        
+        if cache_key is not None:
+            _url_cache.pop(cache_key, None)
+            if len(_url_cache) >= URL_CACHE_MAX_ENTRIES:
+                del _url_cache[next(iter(_url_cache))]
+            _url_cache[cache_key] = (now_ts, response_body)
+        
+        return response(200, response_body)
     
     except ClientError as e:
-        print(f"S3 error: {str(e)}")
+        logger.error("S3 error: %r", e)
         return response(500, {
             'error': 'Failed to generate upload URL',
             'message': str(e)
         })
     
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logger.error("Error: %r", e)
         return response(500, {
             'error': 'Internal server error',
             'message': str(e)
         })
 
 
+def caller_id(event):
+    """Cognito user ID (sub) of the caller, or None without an authorizer context"""
+    try:
+        return event['requestContext']['authorizer']['claims'].get('sub')
+    except (KeyError, TypeError, AttributeError):
+        return None
+
+
+def get_s3_client():
+    """Create the S3 client on first use and reuse it for the container's lifetime"""
+    global s3_client
+    if s3_client is None:
+        s3_client = session.client('s3', config=BOTO_CONFIG)
+    return s3_client
+
+
+def presign_put_url(s3_key, expires_in, now):
+    """
+    Build a SigV4 pre-signed PUT URL for an object in PRODUCT_IMAGES_BUCKET
+    
+    Equivalent to generate_presigned_url('put_object') for a Bucket/Key-only
+    request (only the host header is signed, payload is UNSIGNED-PAYLOAD), but
+    skips botocore's request pipeline: the bucket, region and method are fixed,
+    so signing reduces to string formatting plus one HMAC with a cached key.
+    
+    Returns None when the fast path doesn't apply (no credentials or region,
+    or a dotted bucket name that needs path-style addressing).
+    """
+    credentials = session.get_credentials()
+    if credentials is None or not AWS_REGION or not PRODUCT_IMAGES_BUCKET or '.' in PRODUCT_IMAGES_BUCKET:
+        return None
+    
+    # Refreshable credentials renew themselves here if they are about to expire
+    creds = credentials.get_frozen_credentials()
+    
+    amz_date = (
+        f'{now.year:04d}{now.month:02d}{now.day:02d}'
+        f'T{now.hour:02d}{now.minute:02d}{now.second:02d}Z'
+    )
+    date_stamp = amz_date[:8]
+    scope = f'{date_stamp}/{AWS_REGION}/s3/aws4_request'
+    host = f'{PRODUCT_IMAGES_BUCKET}.s3.{AWS_REGION}.amazonaws.com'
+    path = '/' + quote(s3_key, safe='/~')
+    
+    # Query parameters in canonical (sorted) order
+    query = [
+        ('X-Amz-Algorithm', 'AWS4-HMAC-SHA256'),
+        ('X-Amz-Credential', f'{creds.access_key}/{scope}'),
+        ('X-Amz-Date', amz_date),
+        ('X-Amz-Expires', str(expires_in))
+    ]
+    if creds.token:
+        query.append(('X-Amz-Security-Token', creds.token))
+    query.append(('X-Amz-SignedHeaders', 'host'))
+    canonical_query = '&'.join(f"{name}={quote(value, safe='-_.~')}" for name, value in query)
+    
+    canonical_request = f'PUT\n{path}\n{canonical_query}\nhost:{host}\n\nhost\nUNSIGNED-PAYLOAD'
+    string_to_sign = (
+        f'AWS4-HMAC-SHA256\n{amz_date}\n{scope}\n'
+        + hashlib.sha256(canonical_request.encode()).hexdigest()
+    )
+    signature = hmac.new(
+        get_signing_key(creds.secret_key, date_stamp),
+        string_to_sign.encode(),
+        hashlib.sha256
+    ).hexdigest()
+    
+    return f'https://{host}{path}?{canonical_query}&X-Amz-Signature={signature}'
+
+
+def get_signing_key(secret_key, date_stamp):
+    """Derive (or reuse) the SigV4 signing key for S3 in this region"""
+    cache_key = (secret_key, date_stamp, AWS_REGION)
+    signing_key = _signing_key_cache.get(cache_key)
+    if signing_key is None:
+        signing_key = ('AWS4' + secret_key).encode()
+        for part in (date_stamp, AWS_REGION, 's3', 'aws4_request'):
+            signing_key = hmac.new(signing_key, part.encode(), hashlib.sha256).digest()
+        # Keep only the current key; older dates, rotated secrets or other regions are never reused
+        _signing_key_cache.clear()
+        _signing_key_cache[cache_key] = signing_key
+    return signing_key
+
+
 def response(status_code, body):
     """Generate API Gateway response"""
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-            'Access-Control-Allow-Methods': 'GET,OPTIONS'
-        },
-        'body': json.dumps(body)
+        'headers': RESPONSE_HEADERS,
+        'body': orjson.dumps(body).decode()
     }
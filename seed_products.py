@@ -1,12 +1,32 @@
 import boto3
+import random
 import sys
+import time
+from boto3.dynamodb.types import TypeSerializer
+from botocore.config import Config
 
-# Initialize DynamoDB resource
-# Note: Ensure your AWS credentials are configured
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-table = dynamodb.Table('dev-ProductsTable')
+TABLE_NAME = 'dev-ProductsTable'
+
+# Keep-alive pooled connections; adaptive retries rate-limit client-side when throttled
+BOTO_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=25,
+    retries={'mode': 'adaptive'}
+)
+
+# Unprocessed items (usually throttling) are resent with exponential backoff
+# and full jitter, up to MAX_WRITE_ATTEMPTS BatchWriteItem calls
+MAX_WRITE_ATTEMPTS = 5
+BASE_RETRY_DELAY = 0.1
+
+# Converts plain Python values to DynamoDB AttributeValues for the low-level client
+serializer = TypeSerializer()
 
 def seed_products():
+    # Initialize the low-level DynamoDB client here so importing this module stays cheap
+    # Note: Ensure your AWS credentials are configured
+    ddb = boto3.client('dynamodb', region_name='us-east-1', config=BOTO_CONFIG)
+    
     print("🚀 Seeding products into dev-ProductsTable...")
     
     products = [
@@ -34,9 +54,25 @@ def seed_products():
     ]
     
     try:
+        # One BatchWriteItem call (up to 25 items); resend anything left unprocessed
+        request_items = {TABLE_NAME: []}
         for product in products:
             print(f"Adding {product['name']}...")
-            table.put_item(Item=product)
+            item = {name: serializer.serialize(value) for name, value in product.items()}
+            request_items[TABLE_NAME].append({'PutRequest': {'Item': item}})
+        
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            if attempt:
+                time.sleep(random.uniform(0, BASE_RETRY_DELAY * 2 ** attempt))
+            result = ddb.batch_write_item(RequestItems=request_items)
+            request_items = result.get('UnprocessedItems')
+            if not request_items:
+                break
+        else:
+            raise RuntimeError(
+                f"{len(request_items[TABLE_NAME])} items still unprocessed "
+                f"after {MAX_WRITE_ATTEMPTS} attempts"
+            )
         print("✅ Successfully added 3 products!")
     except Exception as e:
         print(f"❌ Error seeding products: {str(e)}")